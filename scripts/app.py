@@ -5,7 +5,7 @@ import streamlit as st
 import faiss
 from sentence_transformers import SentenceTransformer
 import anthropic
-from query import load_model, load_index_assets, retrieve, answer_query
+from query import load_model, load_index_assets, retrieve, build_context
 
 # Paths and environment setup
 script_dir = Path(__file__).parent
@@ -18,13 +18,46 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
 
 
-# Load embedding model, FAISS, chunks, metadata
+# Load embedding model, FAISS, chunks, metadata.
+# Cached separately: the model survives index rebuilds, and the index
+# cache is keyed on the index file's mtime so re-running build_index.py
+# is picked up without restarting the app. The mtime is passed as an
+# explicit argument because st.cache_resource hash_funcs match on exact
+# type (PosixPath vs Path) and would silently skip a Path-keyed hasher.
 @st.cache_resource(show_spinner=False)
+def _load_model():
+    return load_model()
+
+@st.cache_resource(show_spinner=False)
+def _load_index_assets(index_path: Path, index_mtime: float):
+    return load_index_assets()
+
 def load_assets():
-    model = load_model()
-    index, chunks, metadata = load_index_assets()
+    model = _load_model()
+    index_path = processed_dir / "faiss.index"
+    index, chunks, metadata = _load_index_assets(index_path, index_path.stat().st_mtime)
     return model, index, chunks, metadata
 
+# Singleton Anthropic client: keeps one HTTP connection pool alive
+# across turns instead of a TLS handshake per message
+@st.cache_resource(show_spinner=False)
+def get_anthropic_client():
+    return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+
+# Retrieval cache keyed on the question text; underscore-prefixed args
+# are excluded from the cache key since model/index/chunks are unhashable
+# resources
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def cached_retrieve(user_msg, k, _model, _index, _chunks, _metadata):
+    return retrieve(
+        user_msg,
+        model=_model,
+        index=_index,
+        chunks=_chunks,
+        metadata=_metadata,
+        k=k,
+    )
+
 # Streamlit Chat UI
 def main():
     st.set_page_config(page_title="AD biomarkers RAG Chatbot", layout="wide")
@@ -58,53 +91,41 @@ def main():
     with st.chat_message("assistant"):
         # Retrieval
         with st.spinner("Retrieving relevant chunks…"):
-            results = retrieve(
-                            user_msg,
-                            model=model,
-                            index=index,
-                            chunks=chunks,
-                            metadata=metadata,
-                            k=5,
-                            )
+            results = cached_retrieve(user_msg, 5, model, index, chunks, metadata)
     
-        # Generation
-        with st.spinner("Generating answer…"):
-            # Build context for Claude
-            context_blocks = []
-            for r in results:
-                header = f"(PMCID={r['pmcid']}, Section={r['section_title']})"
-                context_blocks.append(header + "\n" + r["chunk"])
-            context = "\n\n---\n\n".join(context_blocks)
-            context += "---\n"
+        # Generation: stream tokens into a placeholder as they arrive
+        # instead of blocking on the full completion
+        # Build context for Claude
+        context = build_context(results)
 
-            # set up client and 
-            client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-            content = "Use the provided excerpts from \
-                Alzheimer's research to answer the question that follows.\n\n" \
-                    + f"Context:\n{context}\n\nQuestion: {user_msg}"
-            msg = client.messages.create(
-                                    model="claude-sonnet-4-5",
-                                    max_tokens=1024,
-                                    messages=[
-                                        {
-                                            "role": "user",
-                                            "content": content,
-                                        }
-                                    ]
-                                    )
-            answer = msg.content[0].text
-        
-        st.write(answer)
+        # set up client and
+        client = get_anthropic_client()
+        content = "Use the provided excerpts from \
+            Alzheimer's research to answer the question that follows.\n\n" \
+                + f"Context:\n{context}\n\nQuestion: {user_msg}"
+        placeholder = st.empty()
+        out = []
+        with client.messages.stream(
+                                model="claude-sonnet-4-5",
+                                max_tokens=1024,
+                                messages=[
+                                    {
+                                        "role": "user",
+                                        "content": content,
+                                    }
+                                ]
+                                ) as stream:
+            for text in stream.text_stream:
+                out.append(text)
+                placeholder.markdown("".join(out))
+        answer = "".join(out)
         st.session_state.history.append(("assistant", answer))
 
         # Sources
         st.markdown("### Sources")
-        pmcids = list(set([r["pmcid"] for r in results]))
-        out_str = ""
-        for id in pmcids:
-            out_str + f"{id}, "
-        out_str = out_str[:-2]
-        st.markdown(out_str)
+        # dict.fromkeys dedups while keeping retrieval order
+        pmcids = list(dict.fromkeys(r["pmcid"] for r in results))
+        st.markdown(", ".join(pmcids))
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,9 @@
 import argparse
-import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from pdb import set_trace
+import re
 import faiss
 import numpy as np, os
 import json
@@ -21,19 +23,24 @@ processed_dir.mkdir(parents=True, exist_ok=True)
 os.environ["TRANSFORMERS_CACHE"] = str(models_dir)
 os.environ["HF_HOME"] = str(models_dir)
 
-def chunk_section(words, chunk_size=500, overlap=50):
+def chunk_section(text, chunk_size=500, overlap=50):
     """
-    Chunk a single section (already split into words).
+    Chunk a single section of text into sliding windows of chunk_size words.
+    Slices the original string at word boundaries instead of re-joining a
+    word list per window, so each chunk is one substring copy.
     Returns list of text chunks.
     """
-    if len(words) <= chunk_size:
-        return [" ".join(words)]
+    spans = [m.span() for m in re.finditer(r"\S+", text)]
+    if not spans:
+        return []
+    if len(spans) <= chunk_size:
+        return [text[spans[0][0]:spans[-1][1]]]
     chunks = []
     start = 0
     step = chunk_size - overlap
-    while start < len(words):
-        end = start + chunk_size
-        chunks.append(" ".join(words[start:end]))
+    while start < len(spans):
+        end = min(start + chunk_size, len(spans))
+        chunks.append(text[spans[start][0]:spans[end - 1][1]])
         start += step
     return chunks
 
@@ -64,8 +71,7 @@ def chunk_paper_text(text, chunk_size=500, overlap=50):
         # but for Title+Abstract block it's not uppercase.
         # Simpler rule: use the *first non-empty line* as title.
         sec_title = lines[0]
-        words = sec.split()
-        sec_chunks = chunk_section(words, chunk_size, overlap)
+        sec_chunks = chunk_section(sec, chunk_size, overlap)
         for chunk_idx, ch in enumerate(sec_chunks):
             all_chunks.append(ch)
             all_section_titles.append(sec_title)
@@ -87,38 +93,106 @@ def load_paper_metadata(paper_stem):
     pmid = md.get("pmid", None)  
     return pmcid, pmid
 
-def load_and_chunk_papers(chunk_size=500, overlap=50):
-    all_chunks = []
-    metadata = []
-    for txt_file in papers_dir.glob("PMC*.txt"):
-        print(f"Processing {txt_file.name}...")
-        with open(txt_file, "r", encoding="utf-8") as f:
-            text = f.read()
-        paper_stem = txt_file.stem  
-        pmcid, pmid = load_paper_metadata(paper_stem)
-
-        # chunking
-        chunks, section_titles, section_ids, chunk_ids = chunk_paper_text(
-            text, chunk_size=chunk_size, overlap=overlap
-        )
+def _chunk_one_file(txt_file, chunk_size=500, overlap=50):
+    """
+    Read + chunk a single paper. Returns (chunks, metadata_list).
+    Runs in a worker process, so it must stay self-contained.
+    """
+    print(f"Processing {txt_file.name}...")
+    with open(txt_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    paper_stem = txt_file.stem
+    pmcid, pmid = load_paper_metadata(paper_stem)
+
+    # chunking
+    chunks, section_titles, section_ids, chunk_ids = chunk_paper_text(
+        text, chunk_size=chunk_size, overlap=overlap
+    )
 
-        for i, ch in enumerate(chunks):
-            md = {
-                "pmcid": paper_stem,
-                "section_index": section_ids[i],
-                "section_title": section_titles[i],
-                "chunk_index_in_section": chunk_ids[i],
-            }
-            all_chunks.append(ch)
-            metadata.append(md)
+    metadata = []
+    for i in range(len(chunks)):
+        metadata.append({
+            "pmcid": paper_stem,
+            "section_index": section_ids[i],
+            "section_title": section_titles[i],
+            "chunk_index_in_section": chunk_ids[i],
+        })
+    return chunks, metadata
 
-    print(f"Total chunks: {len(all_chunks)}")
+def load_and_chunk_papers(chunk_size=500, overlap=50):
+    # papers are independent, so chunk them across cores; map() keeps
+    # results in input order
+    txt_files = sorted(papers_dir.glob("PMC*.txt"))
+    worker = partial(_chunk_one_file, chunk_size=chunk_size, overlap=overlap)
+    with ProcessPoolExecutor() as ex:
+        per_file = list(ex.map(worker, txt_files, chunksize=8))
+
+    # sizes are known once the workers return, so fill pre-sized lists
+    # instead of growing them append-by-append
+    total = sum(len(chunks) for chunks, _ in per_file)
+    all_chunks = [None] * total
+    metadata = [None] * total
+    pos = 0
+    for chunks, md in per_file:
+        n = len(chunks)
+        all_chunks[pos:pos + n] = chunks
+        metadata[pos:pos + n] = md
+        pos += n
+
+    print(f"Total chunks: {total}")
     return all_chunks, metadata
 
+def save_chunks(chunks, out_dir):
+    """
+    Store chunks as one UTF-8 blob plus an int64 offset array so the app
+    can memory-map them instead of unpickling every chunk at startup.
+    """
+    encoded = [ch.encode("utf-8") for ch in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(out_dir / "chunks.bin", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(out_dir / "chunk_offsets.npy", offsets)
+
+def save_metadata(metadata, out_path):
+    """
+    Store metadata column-wise (one array per field) instead of a pickled
+    list of dicts: loads faster and drops the per-dict object overhead.
+    """
+    np.savez_compressed(
+        out_path,
+        pmcid=np.array([m["pmcid"] for m in metadata], dtype=object),
+        section_index=np.array([m["section_index"] for m in metadata], dtype=np.int32),
+        section_title=np.array([m["section_title"] for m in metadata], dtype=object),
+        chunk_index_in_section=np.array(
+            [m["chunk_index_in_section"] for m in metadata], dtype=np.int32
+        ),
+    )
+
 def build_faiss_index(embeddings, out_path):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings.astype("float32"))
+    # encode(..., convert_to_numpy=True) already yields float32, so no
+    # astype copy of the full matrix is needed here
+    assert embeddings.dtype == np.float32, embeddings.dtype
+    n, dim = embeddings.shape
+    # Inner product on unit vectors == cosine similarity, and avoids the
+    # cancellation in the L2 expansion for high-dim float32 embeddings.
+    if n < 10000:
+        # HNSW graph index: sub-linear search instead of a brute-force
+        # scan over every chunk vector. 32 neighbors per node is the
+        # usual default.
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+    else:
+        # larger corpora: IVF + product quantization compresses each
+        # vector to 64 bytes and search only probes a few cells
+        nlist = int(4 * np.sqrt(n))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(
+            quantizer, dim, nlist, 64, 8, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+    index.add(embeddings)
     faiss.write_index(index, str(out_path))
 
 def main():
@@ -134,13 +208,24 @@ def main():
     )
 
     print("Loading embedding model...")
-    model = SentenceTransformer(args.model, device="cuda")
+    model = SentenceTransformer(
+        args.model,
+        device="cuda",
+        model_kwargs={"torch_dtype": torch.bfloat16},
+    )
+    # 500-word chunks tokenize to well under 1k tokens; capping the
+    # sequence length bounds padding in each length-sorted batch
+    model.max_seq_length = 1024
 
     print("Embedding chunks...")
+    # encode() length-sorts the chunk list internally, so larger batches
+    # mostly pad to similar lengths; 64 fits Qwen3-8B on an 80GB card
     embeddings = model.encode(
                             chunks,
-                            batch_size=8,
+                            batch_size=64,
                             show_progress_bar=True,
+                            convert_to_numpy=True,
+                            normalize_embeddings=True,
                             )
 
     print("Building FAISS index...")
@@ -150,11 +235,8 @@ def main():
     )
 
     print("Saving chunks + metadata...")
-    with open(processed_dir / "chunks.pkl", "wb") as f:
-        pickle.dump(chunks, f)
-
-    with open(processed_dir / "metadata.pkl", "wb") as f:
-        pickle.dump(metadata, f)
+    save_chunks(chunks, processed_dir)
+    save_metadata(metadata, processed_dir / "metadata.npz")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,47 +1,74 @@
 import argparse
-import time
+import asyncio
 import json
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from Bio import Entrez
+try:
+    # C parser, ~5-10x faster than the stdlib on multi-MB PMC articles;
+    # the find/findall/itertext calls below are API-compatible
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+import aiohttp
 
 
-# PATHS 
+# PATHS
 script_dir = Path(__file__).parent
 project_root = script_dir.parent
 papers_dir = project_root / "data" / "papers"
 papers_dir.mkdir(parents=True, exist_ok=True)
 
-Entrez.email = "rohit.tripathy@jax.org"
-
-def search_pubmed(query, n_pmids):
-    handle = Entrez.esearch(
-        db="pubmed",
-        term=query,
-        retmax=n_pmids,
-        sort="relevance",
-    )
-    res = Entrez.read(handle)
-    handle.close()
-    return res["IdList"]
-
-
-def get_pmc_id_from_pmid(pmid):
-    h = Entrez.elink(dbfrom="pubmed", id=pmid, linkname="pubmed_pmc")
-    res = Entrez.read(h)
-    h.close()
-    if res and res[0].get("LinkSetDb"):
-        return res[0]["LinkSetDb"][0]["Link"][0]["Id"]
+EUTILS_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+ENTREZ_EMAIL = "rohit.tripathy@jax.org"
+
+async def eutils_get(session, sem, endpoint, params):
+    """
+    One rate-limited GET against an E-utilities endpoint.
+    The semaphore has 3 slots and each request holds its slot for a full
+    second, which keeps us under NCBI's 3 requests/sec limit no matter
+    how many coroutines are in flight.
+    """
+    params = {**params, "email": ENTREZ_EMAIL, "tool": "AD_biomarker_chatbot"}
+    async with sem:
+        async with session.get(f"{EUTILS_BASE}/{endpoint}", params=params) as resp:
+            resp.raise_for_status()
+            data = await resp.read()
+        await asyncio.sleep(1.0)
+    return data
+
+async def search_pubmed(session, sem, query, n_pmids):
+    data = await eutils_get(session, sem, "esearch.fcgi", {
+        "db": "pubmed",
+        "term": query,
+        "retmax": n_pmids,
+        "sort": "relevance",
+        "retmode": "json",
+    })
+    return json.loads(data)["esearchresult"]["idlist"]
+
+
+async def get_pmc_id_from_pmid(session, sem, pmid):
+    data = await eutils_get(session, sem, "elink.fcgi", {
+        "dbfrom": "pubmed",
+        "id": pmid,
+        "linkname": "pubmed_pmc",
+        "retmode": "json",
+    })
+    linksets = json.loads(data).get("linksets", [])
+    if linksets and linksets[0].get("linksetdbs"):
+        return str(linksets[0]["linksetdbs"][0]["links"][0])
     return None
 
-def fetch_or_load_xml(pmc_id):
+async def fetch_or_load_xml(session, sem, pmc_id):
     xml_path = papers_dir / f"PMC{pmc_id}.xml"
     if xml_path.exists():
         with open(xml_path, "rb") as f:
             return f.read()
-    handle = Entrez.efetch(db="pmc", id=pmc_id, rettype="full", retmode="xml")
-    xml_bytes = handle.read()
-    handle.close()
+    xml_bytes = await eutils_get(session, sem, "efetch.fcgi", {
+        "db": "pmc",
+        "id": pmc_id,
+        "rettype": "full",
+        "retmode": "xml",
+    })
     with open(xml_path, "wb") as f:
         f.write(xml_bytes)
     return xml_bytes
@@ -116,9 +143,9 @@ def extract_metadata(root, pmc_id):
     md["doi"] = doi.text if doi is not None else None
     return md
 
-def process_pmc(pmc_id):
+async def process_pmc(session, sem, pmc_id):
     try:
-        raw = fetch_or_load_xml(pmc_id)
+        raw = await fetch_or_load_xml(session, sem, pmc_id)
         root = parse_xml(raw)
 
         title_abs = extract_title_abstract(root)
@@ -143,29 +170,33 @@ def process_pmc(pmc_id):
         print(f"Failed PMC{pmc_id}: {e}")
         return False
 
+async def main_async(N):
+    query_n = N * 3  # factor of 3
+    query = "(Alzheimer's disease) AND (biomarkers) AND (2023:2025[dp])"
+    sem = asyncio.Semaphore(3)
+    async with aiohttp.ClientSession() as session:
+        print(f"Searching PubMed for {query_n} PMIDs ...")
+        pmids = await search_pubmed(session, sem, query, query_n)
+        print(f"Found {len(pmids)} PMIDs")
+
+        # resolve all PMC ids concurrently, keep the first N hits in
+        # relevance order, then fetch + parse those concurrently too
+        pmc_ids = await asyncio.gather(
+            *(get_pmc_id_from_pmid(session, sem, pmid) for pmid in pmids)
+        )
+        pmc_ids = [p for p in pmc_ids if p is not None][:N]
+        results = await asyncio.gather(
+            *(process_pmc(session, sem, pmc_id) for pmc_id in pmc_ids)
+        )
+    count = sum(results)
+    print(f"Done. Extracted {count} PMC articles.")
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--n", type=int, default=50,
                         help="Number of final papers to download (default=50)")
     args = parser.parse_args()
-    N = args.n
-    query_n = N * 3  # factor of 3
-    query = "(Alzheimer's disease) AND (biomarkers) AND (2023:2025[dp])"
-    print(f"Searching PubMed for {query_n} PMIDs ...")
-    pmids = search_pubmed(query, query_n)
-    print(f"Found {len(pmids)} PMIDs")
-    count = 0
-    for pmid in pmids:
-        pmc_id = get_pmc_id_from_pmid(pmid)
-        if pmc_id is None:
-            continue
-        ok = process_pmc(pmc_id)
-        if ok:
-            count += 1
-        time.sleep(0.5)
-        if count >= N:
-            break
-    print(f"Done. Extracted {count} PMC articles.")
+    asyncio.run(main_async(args.n))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,9 @@
+import io
 import os
 from pathlib import Path
-import pickle
 import faiss
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 import anthropic
 from pdb import set_trace
@@ -14,34 +16,121 @@ models_dir = project_root / "models"
 os.environ["TRANSFORMERS_CACHE"] = str(models_dir)
 os.environ["HF_HOME"] = str(models_dir)
 
-def load_model(model_name="Qwen/Qwen3-Embedding-8B"):
-    return SentenceTransformer(model_name, device="cuda", trust_remote_code=True)
+def load_model(model_name="Qwen/Qwen3-Embedding-8B", backend=None):
+    """
+    Load the embedding model.
+    backend: "torch" (default) or "onnx"; the ONNX backend runs the encoder
+    through ONNX Runtime (requires optimum + onnxruntime-gpu) which is much
+    faster for the batch-of-one encodes done at query time. Can also be set
+    via the EMBEDDING_BACKEND env var.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    kwargs = {}
+    if backend == "torch":
+        # bf16 halves memory traffic on tensor cores; FAISS still gets
+        # float32 vectors because encode() casts when converting to numpy
+        kwargs["model_kwargs"] = {"torch_dtype": torch.bfloat16}
+    return SentenceTransformer(
+        model_name,
+        device="cuda",
+        trust_remote_code=True,
+        backend=backend,
+        **kwargs,
+    )
+
+# holds the faiss GPU resources for as long as a GPU-cloned index is in
+# use; the SWIG proxies don't accept new attributes, so the reference
+# can't live on the index itself
+_gpu_resources = None
+
+class ChunkStore:
+    """
+    Read-only view over the chunks blob written by build_index.py.
+    The blob and offset array are memory-mapped, so a chunk is only paged
+    in (and decoded) when retrieval actually touches it.
+    """
+    def __init__(self, processed_dir):
+        self._offsets = np.load(processed_dir / "chunk_offsets.npy", mmap_mode="r")
+        self._blob = np.memmap(processed_dir / "chunks.bin", dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
 
 def load_index_assets():
     index = faiss.read_index(str(processed_dir / "faiss.index"))
-    with open(processed_dir / "chunks.pkl", "rb") as f:
-        chunks = pickle.load(f)
-    with open(processed_dir / "metadata.pkl", "rb") as f:
-        metadata = pickle.load(f)
+    # widen the search beam a bit for better recall at k=5; the index is
+    # HNSW for small corpora and IVFPQ for large ones (see build_index.py)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = 64
+    else:
+        index.nprobe = 16
+    # If faiss-gpu is installed, run search on the GPU alongside the
+    # embedding model. HNSW has no GPU kernel, so fall back to CPU when
+    # the clone is unsupported for the index type.
+    if hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0:
+        global _gpu_resources
+        try:
+            res = faiss.StandardGpuResources()
+            index = faiss.index_cpu_to_gpu(res, 0, index)
+            _gpu_resources = res
+        except RuntimeError:
+            pass
+    chunks = ChunkStore(processed_dir)
+    # column-wise metadata: one array per field, materialized up front so
+    # retrieval doesn't re-decompress the npz on every access
+    with np.load(processed_dir / "metadata.npz", allow_pickle=True) as npz:
+        metadata = {name: npz[name] for name in npz.files}
     return index, chunks, metadata
 
 
+def retrieve_batch(queries, model, index, chunks, metadata, k=5):
+    """
+    Top-k retrieval for a list of queries.
+    One encode + one index.search for the whole batch, so the per-call
+    overhead of the 8B encoder is amortized across queries.
+    """
+    q_emb = model.encode(queries, convert_to_numpy=True, normalize_embeddings=True)
+    D, I = index.search(q_emb, k)
+    all_results = []
+    for row in I:
+        results = []
+        for idx in row:
+            results.append({
+                "chunk": chunks[idx],
+                "pmcid": metadata["pmcid"][idx],
+                "section_index": metadata["section_index"][idx],
+                "section_title": metadata["section_title"][idx],
+                "chunk_index_in_section": metadata["chunk_index_in_section"][idx],
+                "faiss_id": idx
+            })
+        all_results.append(results)
+    return all_results
+
+
 def retrieve(query, model, index, chunks, metadata, k=5):
-    """Top-k retrieval"""
-    q_emb = model.encode([query], convert_to_numpy=True)
-    D, I = index.search(q_emb.astype("float32"), k)
-    results = []
-    for idx in I[0]:
-        m = metadata[idx]
-        results.append({
-            "chunk": chunks[idx],
-            "pmcid": m["pmcid"],
-            "section_index": m["section_index"],
-            "section_title": m["section_title"],
-            "chunk_index_in_section": m["chunk_index_in_section"],
-            "faiss_id": idx
-        })
-    return results
+    """Top-k retrieval for a single query"""
+    return retrieve_batch([query], model, index, chunks, metadata, k=k)[0]
+
+
+def build_context(results):
+    """
+    Assemble the Claude prompt context from retrieved chunks.
+    Writes into a single StringIO buffer instead of building and joining
+    intermediate block strings; shared by query.py and app.py.
+    """
+    buf = io.StringIO()
+    for i, r in enumerate(results):
+        if i:
+            buf.write("\n\n---\n\n")
+        buf.write(f"(PMCID={r['pmcid']}, Section={r['section_title']})\n")
+        buf.write(r["chunk"])
+    buf.write("---\n")
+    return buf.getvalue()
 
 
 def answer_query(question, k=5, model_name="Qwen/Qwen3-Embedding-8B"):
@@ -53,19 +142,16 @@ def answer_query(question, k=5, model_name="Qwen/Qwen3-Embedding-8B"):
     results = retrieve(question, emb_model, index, chunks, metadata, k=k)
 
     # Build context for Claude
-    context_blocks = []
-    for r in results:
-        header = f"(PMCID={r['pmcid']}, Section={r['section_title']})"
-        context_blocks.append(header + "\n" + r["chunk"])
-    context = "\n\n---\n\n".join(context_blocks)
-    context += "---\n"
+    context = build_context(results)
 
     # Claude client
     client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
     content = "Use the provided excerpts from \
         Alzheimer's research to answer the question that follows.\n\n" \
             + f"Context:\n{context}\n\nQuestion: {question}"
-    msg = client.messages.create(
+    # stream the completion so callers start receiving text at the first
+    # token instead of waiting for the full 1024-token response
+    with client.messages.stream(
                             model="claude-sonnet-4-5",
                             max_tokens=1024,
                             messages=[
@@ -74,8 +160,9 @@ def answer_query(question, k=5, model_name="Qwen/Qwen3-Embedding-8B"):
                                     "content": content,
                                 }
                             ]
-                            )
-    return msg.content[0].text, results
+                            ) as stream:
+        answer = "".join(stream.text_stream)
+    return answer, results
 
 if __name__ == "__main__":
     # example query 